@@ -5,10 +5,22 @@ Search for content across various platforms using the Open Measures Public API
 with AI-powered natural language search using Claude
 """
 
-import requests
-import json
+import httpx
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+
+from query_parsing import SITES, cached_system, is_bare_term, parse_trivial_query, strip_code_fence
+from serialization import JSONDecodeError, dumps, loads
+
+# Total characters of result text sent to Claude for summaries and analyses
+_BUDGET_CHARS = 12000
+
+# Shared read-only fallback for missing nested fields in hits; never mutate it
+_EMPTY: Dict[str, Any] = {}
 
 
 class OpenMeasuresAPI:
@@ -17,15 +29,100 @@ class OpenMeasuresAPI:
     BASE_URL = "https://api.openmeasures.io/content"
     
     # Available platforms
-    SITES = ["telegram", "gettr", "win", "gab", "parler", "scored", "truthsocial"]
+    SITES = SITES
     
     # Query types
     QUERY_TYPES = ["content", "boolean_content", "query_string"]
     
+    # Open Measures responses retried with exponential backoff (the HTTP
+    # transport itself only retries connection failures)
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.2
+    
+    # Parameters for the search prefetched while Claude parses a query
+    SPECULATIVE_SITE = "telegram"
+    SPECULATIVE_LIMIT = 20
+    
     def __init__(self, claude_api_key: Optional[str] = None):
-        self.session = requests.Session()
+        # Pooled HTTP/2 client: calls to Open Measures and Anthropic reuse (and
+        # multiplex over) one connection per host. Claude replies can take a while,
+        # so the read timeout is longer than the rest.
+        self.client = httpx.Client(
+            timeout=httpx.Timeout(30.0, read=120.0),
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+            )
+        )
         self.claude_api_key = claude_api_key
         self.claude_api_url = "https://api.anthropic.com/v1/messages"
+        
+        # In-process response cache: key -> (timestamp, response, size in bytes).
+        # Bounded by the size of the raw responses since one search can be tens of MB.
+        self._cache: Dict[str, Tuple[float, Any, int]] = {}
+        self._ttl = 300
+        self._cache_bytes = 0
+        self._cache_max_bytes = 64 * 1024 * 1024
+        self._cache_max_entry_bytes = 8 * 1024 * 1024
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.trivial_hits = 0
+        
+        self._executor = ThreadPoolExecutor(max_workers=4)
+    
+    def _cache_key(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Build a deterministic cache key from a request payload"""
+        raw = dumps(payload, sort_keys=True)
+        return hashlib.sha256(f"{kind}:{raw}".encode()).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[Any]:
+        """Return a cached response if it is still fresh"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry and time.time() - entry[0] < self._ttl:
+                self.cache_hits += 1
+                return entry[1]
+            self.cache_misses += 1
+            return None
+    
+    def _cache_set(self, key: str, value: Any, size: int) -> None:
+        """Store a response in the cache, evicting stale and then oldest entries to stay in budget"""
+        if size > self._cache_max_entry_bytes:
+            return
+        
+        with self._cache_lock:
+            now = time.time()
+            self._cache_pop(key)
+            if self._cache_bytes + size > self._cache_max_bytes:
+                for k, (ts, _, _) in list(self._cache.items()):
+                    if now - ts >= self._ttl:
+                        self._cache_pop(k)
+                while self._cache and self._cache_bytes + size > self._cache_max_bytes:
+                    self._cache_pop(next(iter(self._cache)))
+            
+            self._cache[key] = (now, value, size)
+            self._cache_bytes += size
+    
+    def _cache_pop(self, key: str) -> None:
+        """Remove a cache entry and release its size from the budget (caller holds _cache_lock)"""
+        entry = self._cache.pop(key, None)
+        if entry:
+            self._cache_bytes -= entry[2]
+    
+    def _get_with_retry(self, url: str, params: Dict[str, Any]) -> httpx.Response:
+        """GET a URL, retrying rate-limit and server errors with exponential backoff"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            response = self.client.get(url, params=params)
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_RETRIES:
+                return response
+            
+            # Honour the server's Retry-After (capped) before falling back to backoff
+            retry_after = response.headers.get("Retry-After", "")
+            delay = min(float(retry_after), 10.0) if retry_after.isdigit() else self.RETRY_BACKOFF * 2 ** attempt
+            time.sleep(delay)
     
     def search(
         self,
@@ -35,7 +132,8 @@ class OpenMeasuresAPI:
         since: Optional[str] = None,
         until: Optional[str] = None,
         querytype: str = "content",
-        sortdesc: bool = False
+        sortdesc: bool = False,
+        quiet: bool = False
     ) -> Dict[str, Any]:
         """
         Search for content on Open Measures platforms
@@ -48,6 +146,7 @@ class OpenMeasuresAPI:
             until: End date (ISO format or None for default)
             querytype: Type of query - "content", "boolean_content", or "query_string"
             sortdesc: Sort results in descending order
+            quiet: Don't print request errors (they are still returned)
             
         Returns:
             Dictionary containing API response with search results
@@ -68,13 +167,21 @@ class OpenMeasuresAPI:
         if until:
             params["until"] = until
         
+        key = self._cache_key("search", params)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.session.get(self.BASE_URL, params=params)
+            response = self._get_with_retry(self.BASE_URL, params)
             response.raise_for_status()
-            return response.json()
+            result = loads(response.content)
+            self._cache_set(key, result, len(response.content))
+            return result
         
-        except requests.exceptions.RequestException as e:
-            print(f"Error making request: {e}")
+        except (httpx.HTTPError, JSONDecodeError) as e:
+            if not quiet:
+                print(f"Error making request: {e}")
             return {"error": str(e)}
     
     def simple_search(self, term: str, site: str = "telegram", limit: int = 10) -> list:
@@ -99,12 +206,13 @@ class OpenMeasuresAPI:
         except (KeyError, AttributeError):
             return []
     
-    def call_claude(self, prompt: str) -> str:
+    def call_claude(self, prompt: str, system: Optional[List[Dict[str, Any]]] = None) -> str:
         """
         Call Claude API with a prompt
         
         Args:
-            prompt: The prompt to send to Claude
+            prompt: The prompt to send to Claude as the user message
+            system: Optional system content blocks (e.g. a cached instruction block)
             
         Returns:
             Claude's response text
@@ -118,6 +226,25 @@ class OpenMeasuresAPI:
             "anthropic-version": "2023-06-01"
         }
         
+        data = self._claude_payload(prompt, system)
+        
+        key = self._cache_key("claude", data)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = self.client.post(self.claude_api_url, headers=headers, json=data)
+            response.raise_for_status()
+            result = loads(response.content)
+            text = result["content"][0]["text"]
+            self._cache_set(key, text, len(text.encode()))
+            return text
+        except (httpx.HTTPError, JSONDecodeError) as e:
+            return f"Error calling Claude API: {e}"
+    
+    def _claude_payload(self, prompt: str, system: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Build the Messages API request body for a prompt"""
         data = {
             "model": "claude-sonnet-4-20250514",
             "max_tokens": 4096,
@@ -126,13 +253,17 @@ class OpenMeasuresAPI:
             ]
         }
         
-        try:
-            response = requests.post(self.claude_api_url, headers=headers, json=data)
-            response.raise_for_status()
-            result = response.json()
-            return result["content"][0]["text"]
-        except requests.exceptions.RequestException as e:
-            return f"Error calling Claude API: {e}"
+        if system:
+            data["system"] = system
+        
+        return data
+    
+    def _claude_cached(self, prompt: str, system: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """Check whether call_claude would answer this prompt from the cache"""
+        key = self._cache_key("claude", self._claude_payload(prompt, system))
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            return bool(entry) and time.time() - entry[0] < self._ttl
     
     def natural_language_search(self, user_query: str) -> Dict[str, Any]:
         """
@@ -147,35 +278,34 @@ class OpenMeasuresAPI:
         if not self.claude_api_key:
             return {"error": "Claude API key not set"}
         
-        # First, ask Claude to parse the query into API parameters
-        parse_prompt = f"""Given this natural language search query, extract the search parameters for the Open Measures API.
-
-User query: "{user_query}"
-
-Available platforms: {', '.join(self.SITES)}
-Query types: content (simple search), boolean_content (AND/OR logic), query_string (advanced field search)
-
-Return a JSON object with these fields:
-- term: the search term or query
-- site: the platform to search (default: telegram)
-- limit: number of results (default: 20, max: 10000)
-- querytype: type of query (default: content)
-
-Only return the JSON object, nothing else."""
+        # Simple queries are parsed locally; everything else goes to Claude
+        params = parse_trivial_query(user_query)
+        parse_response = ""
+        spec_future = None
+        
+        if params is not None:
+            self.trivial_hits += 1
+            print("⚡ Simple query recognized, skipping Claude parse...")
+        else:
+            parse_prompt = f'User query: "{user_query}"'
 
-        print("🤖 Claude is parsing your query...")
-        parse_response = self.call_claude(parse_prompt)
+            print("🤖 Claude is parsing your query...")
+            
+            # A bare term usually parses to the default search for that term, so run it
+            # while Claude parses. Not worth it when the parse will come from the cache.
+            if is_bare_term(user_query) and not self._claude_cached(parse_prompt, PARSE_SYSTEM):
+                spec_future = self._executor.submit(
+                    self.search, user_query.strip(), self.SPECULATIVE_SITE, self.SPECULATIVE_LIMIT,
+                    quiet=True
+                )
+            parse_response = self.call_claude(parse_prompt, system=PARSE_SYSTEM)
         
         try:
-            # Extract JSON from response (handle markdown code blocks)
-            json_str = parse_response.strip()
-            if json_str.startswith("```"):
-                lines = json_str.split("\n")
-                json_str = "\n".join(lines[1:-1])
-            if json_str.startswith("json"):
-                json_str = json_str[4:].strip()
-            
-            params = json.loads(json_str)
+            if params is None:
+                # Extract JSON from response (handle markdown code blocks)
+                json_str = strip_code_fence(parse_response)
+                
+                params = loads(json_str)
             
             print(f"\n📊 Search parameters:")
             print(f"  Term: {params.get('term')}")
@@ -184,13 +314,18 @@ Only return the JSON object, nothing else."""
             print(f"  Query type: {params.get('querytype')}")
             print("\n🔍 Searching Open Measures API...")
             
-            # Execute the search
-            results = self.search(
-                term=params.get("term", ""),
-                site=params.get("site", "telegram"),
-                limit=params.get("limit", 20),
-                querytype=params.get("querytype", "content")
-            )
+            # Execute the search, reusing the speculative one if it matches
+            if spec_future is not None and self._matches_speculative(params, user_query):
+                results = spec_future.result()
+            else:
+                if spec_future is not None:
+                    spec_future.cancel()
+                results = self.search(
+                    term=params.get("term", ""),
+                    site=params.get("site", "telegram"),
+                    limit=params.get("limit", 20),
+                    querytype=params.get("querytype", "content")
+                )
             
             if "error" in results:
                 return {"error": results["error"]}
@@ -208,26 +343,16 @@ Only return the JSON object, nothing else."""
             results_text = self._format_results_for_summary(hits[:20])  # Limit to 20 for summary
             
             # Ask Claude to summarize the results
-            summary_prompt = f"""Analyze and summarize these search results from the Open Measures API.
-
-Original query: "{user_query}"
+            summary_prompt = f"""Original query: "{user_query}"
 Search term: "{params.get('term')}"
 Platform: {params.get('site')}
 Number of results: {len(hits)}
 
 Results:
-{results_text}
-
-Provide a concise summary that includes:
-1. Key themes and topics found
-2. Notable patterns or trends
-3. Any significant usernames or sources mentioned
-4. Overall sentiment or tone if apparent
-
-Keep the summary under 300 words."""
+{results_text}"""
 
             print("🤖 Claude is analyzing the results...\n")
-            summary = self.call_claude(summary_prompt)
+            summary = self.call_claude(summary_prompt, system=SUMMARY_SYSTEM)
             
             return {
                 "params": params,
@@ -236,23 +361,91 @@ Keep the summary under 300 words."""
                 "total_found": len(hits)
             }
             
-        except json.JSONDecodeError as e:
+        except JSONDecodeError as e:
             return {"error": f"Failed to parse Claude's response: {e}\nResponse: {parse_response}"}
         except Exception as e:
             return {"error": f"Error during natural language search: {e}"}
     
+    def _matches_speculative(self, params: Dict[str, Any], user_query: str) -> bool:
+        """Check whether parsed parameters equal those of the speculative search"""
+        return (
+            str(params.get("term", "")).strip().lower() == user_query.strip().lower()
+            and params.get("site", "telegram") == self.SPECULATIVE_SITE
+            and params.get("limit", 20) == self.SPECULATIVE_LIMIT
+            and params.get("querytype", "content") == "content"
+        )
+    
     def _format_results_for_summary(self, hits: List[Dict]) -> str:
-        """Format search results for Claude to summarize"""
-        formatted = []
-        for i, hit in enumerate(hits[:20], 1):
-            source = hit.get("_source", {})
-            text = (source.get("message") or source.get("txt") or source.get("content") or "")[:500]
-            username = source.get("uinf", {}).get("username", "Unknown")
-            timestamp = source.get("timestamp", "N/A")
-            
-            formatted.append(f"Result {i}:\nUser: {username}\nTime: {timestamp}\nText: {text}\n")
+        """Format search results for Claude to summarize within a shared character budget"""
+        sources = [hit.get("_source") or _EMPTY for hit in hits[:20]]
+        texts = [s.get("message") or s.get("txt") or s.get("content") or "" for s in sources]
+        limits = self._share_budget([len(t) for t in texts], _BUDGET_CHARS)
+        
+        return "\n".join(
+            self._format_hit(i, source, text[:limit])
+            for i, (source, text, limit) in enumerate(zip(sources, texts, limits), 1)
+        )
+    
+    @staticmethod
+    def _share_budget(lengths: List[int], budget: int) -> List[int]:
+        """
+        Split a character budget across texts
+        
+        Shorter texts keep their full length and pass their unused share on to
+        longer ones, so the budget isn't wasted on padding.
+        """
+        limits = [0] * len(lengths)
+        remaining = budget
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        
+        for n, idx in enumerate(order):
+            share = remaining // (len(order) - n)
+            limits[idx] = min(lengths[idx], share)
+            remaining -= limits[idx]
         
-        return "\n".join(formatted)
+        return limits
+    
+    @staticmethod
+    def _format_hit(i: int, source: Dict, text: str) -> str:
+        """Format a single search result for the summary prompt"""
+        uinf = source.get("uinf") or _EMPTY
+        return f"Result {i}:\nUser: {uinf.get('username', 'Unknown')}\nTime: {source.get('timestamp', 'N/A')}\nText: {text}\n"
+
+
+_SITES_JOINED = ", ".join(OpenMeasuresAPI.SITES)
+
+# Static instructions are sent as cached system blocks so Anthropic can reuse
+# the computed prompt prefix; only the per-request details go in the user message
+PARSE_SYSTEM_PROMPT = f"""Given a natural language search query, extract the search parameters for the Open Measures API.
+
+Available platforms: {_SITES_JOINED}
+Query types: content (simple search), boolean_content (AND/OR logic), query_string (advanced field search)
+
+Return a JSON object with these fields:
+- term: the search term or query
+- site: the platform to search (default: telegram)
+- limit: number of results (default: 20, max: 10000)
+- querytype: type of query (default: content)
+
+Only return the JSON object, nothing else."""
+
+SUMMARY_SYSTEM_PROMPT = """Analyze and summarize search results from the Open Measures API.
+
+Provide a concise summary that includes:
+1. Key themes and topics found
+2. Notable patterns or trends
+3. Any significant usernames or sources mentioned
+4. Overall sentiment or tone if apparent
+
+Keep the summary under 300 words."""
+
+ANALYSIS_SYSTEM_PROMPT = """Analyze search results from the Open Measures API based on the user's request.
+
+Provide a detailed analysis addressing the user's specific request. Include specific examples and evidence from the results."""
+
+PARSE_SYSTEM = cached_system(PARSE_SYSTEM_PROMPT)
+SUMMARY_SYSTEM = cached_system(SUMMARY_SYSTEM_PROMPT)
+ANALYSIS_SYSTEM = cached_system(ANALYSIS_SYSTEM_PROMPT)
 
 
 def ai_search_mode():
@@ -313,21 +506,17 @@ def ai_search_mode():
                 if analysis_query:
                     results_text = api._format_results_for_summary(result["results"][:20])
                     
-                    custom_prompt = f"""Analyze these search results from the Open Measures API based on the user's request.
-
-Original search: "{user_query}"
+                    custom_prompt = f"""Original search: "{user_query}"
 Platform: {result['params'].get('site')}
 Number of results: {result['total_found']}
 
 User's analysis request: "{analysis_query}"
 
 Results:
-{results_text}
-
-Provide a detailed analysis addressing the user's specific request. Include specific examples and evidence from the results."""
+{results_text}"""
 
                     print("\n🤖 Claude is analyzing...\n")
-                    custom_analysis = api.call_claude(custom_prompt)
+                    custom_analysis = api.call_claude(custom_prompt, system=ANALYSIS_SYSTEM)
                     
                     print("=" * 60)
                     print("CUSTOM ANALYSIS")
@@ -341,9 +530,9 @@ Provide a detailed analysis addressing the user's specific request. Include spec
         show_raw = input("\nShow raw results? (y/n): ").strip().lower()
         if show_raw == 'y':
             for i, hit in enumerate(result["results"][:10], 1):
-                source = hit.get("_source", {})
+                source = hit.get("_source") or _EMPTY
                 text = (source.get("message") or source.get("txt") or source.get("content") or "")
-                username = source.get("uinf", {}).get("username", "N/A")
+                username = (source.get("uinf") or _EMPTY).get("username", "N/A")
                 timestamp = source.get("timestamp", "N/A")
                 
                 print(f"\nResult {i}:")
@@ -387,7 +576,7 @@ def main():
         return
     
     # Get platform
-    print(f"\nAvailable platforms: {', '.join(api.SITES)}")
+    print(f"\nAvailable platforms: {_SITES_JOINED}")
     site = input("Enter platform (default: telegram): ").strip().lower() or "telegram"
     
     if site not in api.SITES:
@@ -449,7 +638,7 @@ def main():
     
     # Display each result
     for i, result in enumerate(hits, 1):
-        source = result.get("_source", {})
+        source = result.get("_source") or _EMPTY
         
         # Try different text fields depending on platform
         text = (source.get("message") or 
@@ -458,7 +647,7 @@ def main():
                 "")
         
         timestamp = source.get("timestamp", "N/A")
-        username = source.get("uinf", {}).get("username", "N/A")
+        username = (source.get("uinf") or _EMPTY).get("username", "N/A")
         
         print(f"Result {i}:")
         print(f"  User: {username}")
@@ -2,13 +2,45 @@
 """
 Open Measures API Server
 REST API server for natural language searches to Open Measures
+
+Run in production with a single gevent worker so outbound Claude and Open
+Measures calls don't block each other; keep -w 1, since stored results
+(/results/<id>) and the caches live in the worker's memory:
+    gunicorn -k gevent -w 1 --worker-connections 1000 -b 0.0.0.0:5000 local-api-OM:app
 """
 
-from flask import Flask, request, jsonify
+# Patch the standard library before httpx is imported so its sockets
+# cooperate with gevent (no-op when gevent isn't installed)
+try:
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:
+    pass
+
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
-import requests
-import json
-from typing import Optional, Dict, Any
+import httpx
+import hashlib
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlencode
+
+from query_parsing import SITES, cached_system, parse_trivial_query, strip_code_fence
+from serialization import JSONDecodeError, dumpb, dumps, loads
+
+# Optional: semantic caching of parsed queries
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    np = None
+    SentenceTransformer = None
 
 # ============================================================================
 # CONFIGURATION - Set your Claude API key here
@@ -16,9 +48,26 @@ from typing import Optional, Dict, Any
 CLAUDE_API_KEY = "your-claude-api-key-here"
 # ============================================================================
 
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (via serialization) for jsonify"""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj)
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all routes
 
+# Compress JSON responses for clients that accept it (brotli, then gzip)
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_MIN_SIZE"] = 1024
+Compress(app)
+
 
 class OpenMeasuresAPI:
     """Simple wrapper for the Open Measures Public API"""
@@ -26,18 +75,120 @@ class OpenMeasuresAPI:
     BASE_URL = "https://api.openmeasures.io/content"
     
     # Available platforms
-    SITES = ["telegram", "gettr", "win", "gab", "parler", "scored", "truthsocial"]
+    SITES = SITES
     
     # Query types
     QUERY_TYPES = ["content", "boolean_content", "query_string"]
     
+    # Open Measures responses retried with exponential backoff (the HTTP
+    # transport itself only retries connection failures)
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.2
+    
+    # Semantic parse cache: paraphrased queries reuse earlier parameters
+    SEMANTIC_MODEL = "all-MiniLM-L6-v2"
+    SEMANTIC_THRESHOLD = 0.95
+    SEMANTIC_CACHE_SIZE = 512
+    
     def __init__(self, claude_api_key: Optional[str] = None):
-        self.session = requests.Session()
+        # Pooled HTTP/2 client: calls to Open Measures and Anthropic reuse (and
+        # multiplex over) one connection per host. Claude replies can take a while,
+        # so the read timeout is longer than the rest.
+        self.client = httpx.Client(
+            timeout=httpx.Timeout(30.0, read=120.0),
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+            )
+        )
         self.claude_api_key = claude_api_key
         self.claude_api_url = "https://api.anthropic.com/v1/messages"
+        
+        # In-process response cache: key -> (timestamp, response, size in bytes).
+        # Bounded by the size of the raw responses since one search can be tens of MB.
+        self._cache: Dict[str, Tuple[float, Any, int]] = {}
+        self._ttl = 300
+        self._cache_bytes = 0
+        self._cache_max_bytes = 64 * 1024 * 1024
+        self._cache_max_entry_bytes = 8 * 1024 * 1024
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.trivial_hits = 0
+        
+        # Full search results kept briefly for GET /results/<rid>
+        self._results_store: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self.results_ttl = 60
+        
+        # Semantic parse cache: normalized query embeddings and their parameters
+        self._sem_enabled = SentenceTransformer is not None
+        self._sem_model = None
+        self._sem_embeddings = None
+        self._sem_params: List[Dict[str, Any]] = []
+        self._sem_lock = threading.Lock()
+        self.semantic_hits = 0
     
-    def search(
-        self,
+    def _cache_key(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Build a deterministic cache key from a request payload"""
+        raw = dumps(payload, sort_keys=True)
+        return hashlib.sha256(f"{kind}:{raw}".encode()).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[Any]:
+        """Return a cached response if it is still fresh"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry and time.time() - entry[0] < self._ttl:
+                self.cache_hits += 1
+                return entry[1]
+            self.cache_misses += 1
+            return None
+    
+    def _cache_set(self, key: str, value: Any, size: int) -> None:
+        """Store a response in the cache, evicting stale and then oldest entries to stay in budget"""
+        if size > self._cache_max_entry_bytes:
+            return
+        
+        with self._cache_lock:
+            now = time.time()
+            self._cache_pop(key)
+            if self._cache_bytes + size > self._cache_max_bytes:
+                for k, (ts, _, _) in list(self._cache.items()):
+                    if now - ts >= self._ttl:
+                        self._cache_pop(k)
+                while self._cache and self._cache_bytes + size > self._cache_max_bytes:
+                    self._cache_pop(next(iter(self._cache)))
+            
+            self._cache[key] = (now, value, size)
+            self._cache_bytes += size
+    
+    def _cache_pop(self, key: str) -> None:
+        """Remove a cache entry and release its size from the budget (caller holds _cache_lock)"""
+        entry = self._cache.pop(key, None)
+        if entry:
+            self._cache_bytes -= entry[2]
+    
+    def store_results(self, results: Dict[str, Any]) -> str:
+        """Keep search results for a short time and return an id to fetch them by"""
+        now = time.time()
+        for rid, (ts, _) in list(self._results_store.items()):
+            if now - ts >= self.results_ttl:
+                self._results_store.pop(rid, None)
+        
+        rid = uuid.uuid4().hex
+        self._results_store[rid] = (now, results)
+        return rid
+    
+    def get_stored_results(self, rid: str) -> Optional[Dict[str, Any]]:
+        """Return stored search results if they haven't expired"""
+        entry = self._results_store.get(rid)
+        if entry and time.time() - entry[0] < self.results_ttl:
+            return entry[1]
+        return None
+    
+    @staticmethod
+    def build_params(
         term: str,
         site: str = "telegram",
         limit: int = 10,
@@ -46,9 +197,7 @@ class OpenMeasuresAPI:
         querytype: str = "content",
         sortdesc: bool = False
     ) -> Dict[str, Any]:
-        """
-        Search for content on Open Measures platforms
-        """
+        """Build the query parameters sent to the Open Measures API"""
         params = {
             "term": term,
             "site": site,
@@ -62,16 +211,56 @@ class OpenMeasuresAPI:
         if until:
             params["until"] = until
         
+        return params
+    
+    def request_url(self, term: str, **kwargs: Any) -> str:
+        """Return the URL-encoded Open Measures request URL for a search"""
+        return f"{self.BASE_URL}?{urlencode(self.build_params(term, **kwargs))}"
+    
+    def _get_with_retry(self, url: str, params: Dict[str, Any]) -> httpx.Response:
+        """GET a URL, retrying rate-limit and server errors with exponential backoff"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            response = self.client.get(url, params=params)
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_RETRIES:
+                return response
+            
+            # Honour the server's Retry-After (capped) before falling back to backoff
+            retry_after = response.headers.get("Retry-After", "")
+            delay = min(float(retry_after), 10.0) if retry_after.isdigit() else self.RETRY_BACKOFF * 2 ** attempt
+            time.sleep(delay)
+    
+    def search(
+        self,
+        term: str,
+        site: str = "telegram",
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        querytype: str = "content",
+        sortdesc: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Search for content on Open Measures platforms
+        """
+        params = self.build_params(term, site, limit, since, until, querytype, sortdesc)
+        
+        key = self._cache_key("search", params)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.session.get(self.BASE_URL, params=params)
+            response = self._get_with_retry(self.BASE_URL, params)
             response.raise_for_status()
-            return response.json()
+            result = loads(response.content)
+            self._cache_set(key, result, len(response.content))
+            return result
         
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, JSONDecodeError) as e:
             return {"error": str(e)}
     
-    def call_claude(self, prompt: str) -> str:
-        """Call Claude API with a prompt"""
+    def call_claude(self, prompt: str, system: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Call Claude API with a prompt and optional system blocks"""
         if not self.claude_api_key:
             return "Error: Claude API key not set"
         
@@ -89,52 +278,317 @@ class OpenMeasuresAPI:
             ]
         }
         
+        if system:
+            data["system"] = system
+        
+        key = self._cache_key("claude", data)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = requests.post(self.claude_api_url, headers=headers, json=data)
+            response = self.client.post(self.claude_api_url, headers=headers, json=data)
             response.raise_for_status()
-            result = response.json()
-            return result["content"][0]["text"]
-        except requests.exceptions.RequestException as e:
+            result = loads(response.content)
+            text = result["content"][0]["text"]
+            self._cache_set(key, text, len(text.encode()))
+            return text
+        except (httpx.HTTPError, JSONDecodeError) as e:
             return f"Error calling Claude API: {e}"
     
     def parse_natural_language_query(self, user_query: str) -> Dict[str, Any]:
         """Use Claude to parse natural language into search parameters"""
-        parse_prompt = f"""Given this natural language search query, extract the search parameters for the Open Measures API.
+        trivial = self._parse_trivial(user_query)
+        if trivial is not None:
+            return trivial
+        
+        embedding = self._embed(user_query)
+        cached = self._semantic_lookup(embedding)
+        if cached is not None:
+            return cached
+        
+        params = self._claude_parse(user_query)
+        self._semantic_store(embedding, params)
+        return params
+    
+    def parse_natural_language_queries(self, user_queries: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parse several queries into search parameters, sending cache misses to Claude together
+        
+        Entries are None for queries the batch answer couldn't be matched to;
+        callers should parse those individually.
+        """
+        parsed: List[Optional[Dict[str, Any]]] = [self._parse_trivial(q) for q in user_queries]
+        embeddings = [self._embed(q) if p is None else None for q, p in zip(user_queries, parsed)]
+        for i, embedding in enumerate(embeddings):
+            if parsed[i] is None:
+                parsed[i] = self._semantic_lookup(embedding)
+        
+        pending = [i for i, params in enumerate(parsed) if params is None]
+        if pending:
+            batch = self._claude_parse_batch([user_queries[i] for i in pending])
+            if batch is not None:
+                for i, params in zip(pending, batch):
+                    parsed[i] = params
+                    self._semantic_store(embeddings[i], params)
+        
+        return parsed
+    
+    def _parse_trivial(self, user_query: str) -> Optional[Dict[str, Any]]:
+        """Parse an obviously simple query locally, counting how often that works"""
+        params = parse_trivial_query(user_query)
+        if params is not None:
+            self.trivial_hits += 1
+        return params
+    
+    def _claude_parse(self, user_query: str) -> Dict[str, Any]:
+        """Ask Claude for the search parameters of a single query"""
+        parse_prompt = f'User query: "{user_query}"'
 
-User query: "{user_query}"
+        response = self.call_claude(parse_prompt, system=PARSE_SYSTEM)
+        
+        try:
+            return loads(strip_code_fence(response))
+        except JSONDecodeError as e:
+            return {"error": f"Failed to parse query: {e}"}
+    
+    def _claude_parse_batch(self, user_queries: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Ask Claude for the search parameters of several queries in one call, or None if the answer doesn't line up"""
+        if len(user_queries) == 1:
+            return [self._claude_parse(user_queries[0])]
+        
+        # Send the queries as a JSON array so one query's text can't pose as another entry
+        parse_prompt = f"User queries: {dumps(user_queries)}"
+        
+        response = self.call_claude(parse_prompt, system=BATCH_PARSE_SYSTEM)
+        
+        # Retrying query by query won't help if Claude itself couldn't be reached
+        if response.startswith("Error"):
+            return [{"error": response} for _ in user_queries]
+        
+        try:
+            parsed = loads(strip_code_fence(response))
+        except JSONDecodeError:
+            return None
+        
+        # Match answers to queries by the echoed index rather than array order
+        by_index: Dict[int, Dict[str, Any]] = {}
+        if isinstance(parsed, list):
+            for item in parsed:
+                if isinstance(item, dict) and isinstance(item.get("index"), int):
+                    params = dict(item)
+                    by_index[params.pop("index")] = params
+        
+        if sorted(by_index) != list(range(len(user_queries))):
+            return None
+        
+        return [by_index[i] for i in range(len(user_queries))]
+    
+    def _embed(self, text: str) -> Optional["np.ndarray"]:
+        """Embed a query for the semantic cache (None if sentence-transformers is unavailable)"""
+        if not self._sem_enabled:
+            return None
+        
+        try:
+            with self._sem_lock:
+                if self._sem_model is None:
+                    self._sem_model = SentenceTransformer(self.SEMANTIC_MODEL)
+            
+            return self._sem_model.encode(text, normalize_embeddings=True)
+        except Exception as e:
+            # Never let the optional cache break parsing: turn it off and use Claude
+            self._disable_semantic_cache(e)
+            return None
+    
+    def _disable_semantic_cache(self, error: Exception) -> None:
+        """Turn off the semantic cache, reporting why only the first time"""
+        with self._sem_lock:
+            if not self._sem_enabled:
+                return
+            self._sem_enabled = False
+        
+        print(f"Semantic cache disabled: {error}")
+    
+    def _semantic_lookup(self, embedding: Optional["np.ndarray"]) -> Optional[Dict[str, Any]]:
+        """Return cached parameters for a near-identical earlier query"""
+        if embedding is None:
+            return None
+        
+        with self._sem_lock:
+            if self._sem_embeddings is None:
+                return None
+            
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            scores = self._sem_embeddings @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] > self.SEMANTIC_THRESHOLD:
+                self.semantic_hits += 1
+                return self._sem_params[best]
+        
+        return None
+    
+    def _semantic_store(self, embedding: Optional["np.ndarray"], params: Dict[str, Any]) -> None:
+        """Remember parsed parameters for a query, evicting the oldest entries"""
+        if embedding is None or "error" in params:
+            return
+        
+        with self._sem_lock:
+            row = embedding[np.newaxis, :]
+            if self._sem_embeddings is None:
+                self._sem_embeddings = row
+            else:
+                self._sem_embeddings = np.vstack([self._sem_embeddings, row])[-self.SEMANTIC_CACHE_SIZE:]
+            self._sem_params.append(params)
+            del self._sem_params[:-self.SEMANTIC_CACHE_SIZE]
 
-Available platforms: {', '.join(self.SITES)}
-Query types: content (simple search), boolean_content (AND/OR logic), query_string (advanced field search)
 
-Return a JSON object with these fields:
-- term: the search term or query
+_SITES_JOINED = ", ".join(OpenMeasuresAPI.SITES)
+
+# The parse instructions never change, so send them as cached system blocks and
+# put only the user queries in the message
+_PARSE_FIELDS = """- term: the search term or query
 - site: the platform to search (default: telegram)
 - limit: number of results (default: 20, max: 10000)
-- querytype: type of query (default: content)
+- querytype: type of query (default: content)"""
+
+PARSE_SYSTEM_PROMPT = f"""Given a natural language search query, extract the search parameters for the Open Measures API.
+
+Available platforms: {_SITES_JOINED}
+Query types: content (simple search), boolean_content (AND/OR logic), query_string (advanced field search)
+
+Return a JSON object with these fields:
+{_PARSE_FIELDS}
 
 Only return the JSON object, nothing else."""
 
-        response = self.call_claude(parse_prompt)
-        
+BATCH_PARSE_SYSTEM_PROMPT = f"""Given a JSON array of natural language search queries, extract the search parameters for the Open Measures API from each one.
+
+Available platforms: {_SITES_JOINED}
+Query types: content (simple search), boolean_content (AND/OR logic), query_string (advanced field search)
+
+Return a JSON array with one object per query, each with these fields:
+- index: the position of the query in the array, starting at 0
+{_PARSE_FIELDS}
+
+Only return the JSON array, nothing else."""
+
+PARSE_SYSTEM = cached_system(PARSE_SYSTEM_PROMPT)
+BATCH_PARSE_SYSTEM = cached_system(BATCH_PARSE_SYSTEM_PROMPT)
+
+
+class BatchParser:
+    """
+    Coalesce concurrent query parses into a single Claude call
+    
+    Requests are queued by the Flask handlers; a background worker drains up
+    to max_batch of them (waiting at most max_wait seconds for stragglers)
+    and parses the whole batch with one Claude request.
+    """
+    
+    def __init__(self, api: OpenMeasuresAPI, max_batch: int = 8, max_wait: float = 0.02, workers: int = 8):
+        self.api = api
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+    
+    def parse(self, user_query: str, timeout: float = 120.0) -> Dict[str, Any]:
+        """Queue a query for parsing and wait for its search parameters"""
+        future: Future = Future()
+        self._queue.put((user_query, future))
         try:
-            json_str = response.strip()
-            if json_str.startswith("```"):
-                lines = json_str.split("\n")
-                json_str = "\n".join(lines[1:-1])
-            if json_str.startswith("json"):
-                json_str = json_str[4:].strip()
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return {"error": "Timed out waiting for the query to be parsed"}
+    
+    def stop(self) -> None:
+        """Stop the background worker"""
+        self._stop.set()
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
             
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
+            # Only wait for more queries when others are already queued up
+            if not self._queue.empty():
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+            
+            self._executor.submit(self._dispatch, batch)
+    
+    def _dispatch(self, batch: List[Tuple[str, Future]]) -> None:
+        queries = [q for q, _ in batch]
+        try:
+            results = self.api.parse_natural_language_queries(queries)
+        except Exception:
+            results = [None] * len(batch)
+        
+        # Parse whatever the batch couldn't answer one by one, in parallel, so a
+        # single bad query can't fail or hold up everyone else's
+        for (query, future), params in zip(batch, results):
+            if params is not None:
+                future.set_result(params)
+            else:
+                self._executor.submit(self._parse_one, query).add_done_callback(
+                    lambda done, future=future: future.set_result(done.result())
+                )
+    
+    def _parse_one(self, user_query: str) -> Dict[str, Any]:
+        try:
+            return self.api.parse_natural_language_query(user_query)
+        except Exception as e:
             return {"error": f"Failed to parse query: {e}"}
 
 
+# Fail fast rather than serving requests that can never be parsed
+if not CLAUDE_API_KEY or CLAUDE_API_KEY == "your-claude-api-key-here":
+    raise SystemExit("Claude API key not configured. Please set CLAUDE_API_KEY in the code.")
+
+# Shared client so the connection pool and caches persist across requests
+_api = OpenMeasuresAPI(claude_api_key=CLAUDE_API_KEY)
+_batch_parser = BatchParser(_api)
+
+
+# The platform list never changes, so serialize it once
+_SITES_BODY = dumpb({
+    "sites": OpenMeasuresAPI.SITES,
+    "query_types": OpenMeasuresAPI.QUERY_TYPES
+})
+
+
+def _json_response(payload: Any) -> Response:
+    """Serialize a (potentially large) payload once and return it as is"""
+    return Response(dumpb(payload), mimetype="application/json")
+
+
 # API Routes
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "Open Measures API Server"})
+    return jsonify({
+        "status": "healthy",
+        "service": "Open Measures API Server",
+        "cache": {
+            "hits": _api.cache_hits,
+            "misses": _api.cache_misses,
+            "semantic_hits": _api.semantic_hits,
+            "trivial_hits": _api.trivial_hits
+        }
+    })
 
 
 @app.route('/search', methods=['POST'])
@@ -150,11 +604,16 @@ def search():
     2. OpenAI chat format: Extracts content from last message in messages array
     
     Response:
-    Returns either raw Open Measures data or OpenAI-formatted chat completion
+    Returns either raw Open Measures data or OpenAI-formatted chat completion.
+    Chat completions reference the full results via GET /results/<result_id>;
+    pass ?inline=1 to also embed them as compact JSON.
     """
-    data = request.get_json()
+    try:
+        data = loads(request.get_data())
+    except JSONDecodeError:
+        data = None
     
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({"error": "Missing request body"}), 400
     
     # Detect if this is an OpenAI chat completion request
@@ -174,6 +633,13 @@ def search():
         if isinstance(last_message, dict) and 'content' in last_message:
             query = last_message['content']
             
+            # OpenAI list-style content: join the text parts
+            if isinstance(query, list):
+                query = "\n".join(
+                    part.get('text', '') for part in query
+                    if isinstance(part, dict) and part.get('type') == 'text'
+                )
+            
             # If the content has the [actor] format, extract just the message part
             # Format: "[actor-name (actor-id) at timestamp]:\nActual message"
             if isinstance(query, str) and ']:' in query:
@@ -185,13 +651,11 @@ def search():
     if not query:
         return jsonify({"error": "Missing query. Provide either 'query' field or 'messages' array"}), 400
     
-    if not CLAUDE_API_KEY or CLAUDE_API_KEY == "your-claude-api-key-here":
-        return jsonify({"error": "Claude API key not configured. Please set CLAUDE_API_KEY in the code."}), 500
-    
-    api = OpenMeasuresAPI(claude_api_key=CLAUDE_API_KEY)
+    if not isinstance(query, str):
+        return jsonify({"error": "Query must be a string"}), 400
     
     # Parse natural language query
-    params = api.parse_natural_language_query(query)
+    params = _batch_parser.parse(query)
     
     if 'error' in params:
         if is_chat_completion:
@@ -207,12 +671,13 @@ def search():
         return jsonify({"error": params['error'], "stage": "parsing"}), 400
     
     # Execute search with parsed parameters
-    results = api.search(
-        term=params.get('term', ''),
-        site=params.get('site', 'telegram'),
-        limit=params.get('limit', 20),
-        querytype=params.get('querytype', 'content')
-    )
+    search_params = {
+        "term": params.get('term', ''),
+        "site": params.get('site', 'telegram'),
+        "limit": params.get('limit', 20),
+        "querytype": params.get('querytype', 'content')
+    }
+    results = _api.search(**search_params)
     
     # If this is a chat completion request, format the response accordingly
     if is_chat_completion:
@@ -222,8 +687,10 @@ def search():
         if isinstance(total_hits, dict):
             total_hits = total_hits.get('value', 0)
         
+        result_id = None
+        
         # Build the actual API request URL (always show this)
-        api_request_url = f"{api.BASE_URL}?term={params.get('term')}&site={params.get('site')}&limit={params.get('limit')}&querytype={params.get('querytype')}"
+        api_request_url = _api.request_url(**search_params)
         
         if 'error' in results:
             response_content = f"Error searching Open Measures: {results['error']}\n\n"
@@ -247,15 +714,22 @@ def search():
             response_content += f"- Results Received: `{len(hits)}`\n"
             response_content += f"- Total Available: `{total_hits}`\n\n"
             response_content += f"**API Request Sent:**\n```\n{api_request_url}\n```\n\n"
-            response_content += "**Raw JSON Results:**\n```json\n"
-            response_content += json.dumps(results, indent=2)
-            response_content += "\n```"
+            # Hand back a reference to the full results rather than inlining them
+            result_id = _api.store_results(results)
+            response_content += f"**Full Results:** {request.host_url}results/{result_id} "
+            response_content += f"(available for {_api.results_ttl}s)"
+            
+            if request.args.get('inline') == '1':
+                response_content += "\n\n**Raw JSON Results:**\n```json\n"
+                response_content += dumps(results)
+                response_content += "\n```"
         
-        return jsonify({
+        return _json_response({
             "id": "chatcmpl-openmeasures",
             "object": "chat.completion",
             "created": int(request.headers.get('X-Request-Time', '0')) or 1234567890,
             "model": data.get('model', 'openai/gpt-oss-20b'),
+            "result_id": result_id,
             "choices": [{
                 "index": 0,
                 "message": {
@@ -267,16 +741,24 @@ def search():
         })
     
     # Return the raw Open Measures API response for simple queries
-    return jsonify(results)
+    return _json_response(results)
+
+
+@app.route('/results/<rid>', methods=['GET'])
+def get_results(rid):
+    """Fetch the full Open Measures results referenced by a chat completion reply"""
+    results = _api.get_stored_results(rid)
+    
+    if results is None:
+        return jsonify({"error": "Results not found or expired"}), 404
+    
+    return _json_response(results)
 
 
 @app.route('/sites', methods=['GET'])
 def get_sites():
     """Get list of available platforms"""
-    return jsonify({
-        "sites": OpenMeasuresAPI.SITES,
-        "query_types": OpenMeasuresAPI.QUERY_TYPES
-    })
+    return Response(_SITES_BODY, mimetype="application/json")
 
 
 if __name__ == '__main__':
@@ -286,8 +768,11 @@ if __name__ == '__main__':
     print("\nEndpoints:")
     print("  GET  /health    - Health check")
     print("  POST /search    - Natural language search")
+    print("  GET  /results/<id> - Full results for a chat completion search")
     print("  GET  /sites     - List available platforms")
-    print("\nStarting server on http://localhost:5000")
+    print("\nStarting development server on http://localhost:5000")
+    print("For concurrent traffic run under gunicorn instead:")
+    print("  gunicorn -k gevent -w 1 --worker-connections 1000 -b 0.0.0.0:5000 local-api-OM:app")
     print("=" * 60)
     print("\nExample requests:")
     print("\n1. Simple format:")
@@ -300,4 +785,4 @@ if __name__ == '__main__':
     print('    -d \'{"messages": [{"role": "user", "content": "Search telegram for Trump"}]}\'')
     print("=" * 60 + "\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
\ No newline at end of file
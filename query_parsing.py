@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Query parsing helpers shared by the CLI and the API server
+Local parsing of simple search requests and handling of Claude's replies
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+# Available platforms
+SITES = ["telegram", "gettr", "win", "gab", "parler", "scored", "truthsocial"]
+
+# Matches a markdown code fence (optionally tagged json) around Claude's output
+FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+# A plain search term: 1-3 words of letters (hyphens allowed inside a word),
+# with no digits, quotes or query operators
+TERM_PATTERN = r"[^\W\d_]+(?:-[^\W\d_]+)*(?:\s+[^\W\d_]+(?:-[^\W\d_]+)*){0,2}"
+TERM_RE = re.compile(TERM_PATTERN)
+
+# Words that show a query asks for more than a plain term search (filler, dates,
+# users, boolean logic, quantities, or another platform)
+NON_TERM_WORDS = frozenset("""
+    posts post messages message content about for with in on of to the a an
+    mentioning hashtag hashtags search find show get me
+    from since until before after last past recent latest today yesterday week month year
+    user users by and or not most popular top trending results result
+    all any some few many more less every one two three four five six seven eight nine ten
+    hundred hundreds thousand thousands
+""".split()) | frozenset(SITES)
+
+# Simple "[search] <platform> [posts] [for|about] <term>" queries are parsed locally without Claude
+TRIVIAL_RE = re.compile(
+    r"^\s*(search\s+)?(" + "|".join(map(re.escape, SITES)) + r")"
+    r"(\s+posts)?(\s+(?:for|about))?\s+(" + TERM_PATTERN + r")\s*$",
+    re.IGNORECASE
+)
+
+# Platforms that are also everyday words need an explicit "search"/"posts"/"for"/"about"
+AMBIGUOUS_SITES = {"win", "scored"}
+
+
+def strip_code_fence(response: str) -> str:
+    """Remove a markdown code fence wrapped around Claude's JSON output"""
+    m = FENCE_RE.match(response)
+    return m.group(1) if m else response.strip()
+
+
+def cached_system(text: str) -> List[Dict[str, Any]]:
+    """Wrap static instructions in a system block marked for prompt caching"""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+def is_bare_term(text: str) -> bool:
+    """Check whether text is just a short plain search term"""
+    text = text.strip()
+    return bool(TERM_RE.fullmatch(text)) and not any(
+        word in NON_TERM_WORDS for word in text.lower().split()
+    )
+
+
+def parse_trivial_query(user_query: str) -> Optional[Dict[str, Any]]:
+    """Extract search parameters from an obviously simple query, or None"""
+    m = TRIVIAL_RE.match(user_query)
+    if not m:
+        return None
+
+    framed, site, term = any(m.group(i) for i in (1, 3, 4)), m.group(2).lower(), m.group(5)
+    if not is_bare_term(term) or (site in AMBIGUOUS_SITES and not framed):
+        return None
+
+    return {"term": term, "site": site, "limit": 20, "querytype": "content"}
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+JSON helpers shared by the CLI and the API server
+Uses orjson when it is installed and falls back to the standard library json
+"""
+
+from typing import Any
+
+try:
+    import orjson
+
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def loads(data: Any) -> Any:
+        """Parse JSON from str or bytes"""
+        return orjson.loads(data)
+
+    def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+        """Serialize an object to a JSON string"""
+        option = 0
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option).decode()
+
+    def dumpb(obj: Any) -> bytes:
+        """Serialize an object to compact UTF-8 encoded JSON bytes"""
+        return orjson.dumps(obj)
+
+except ImportError:
+    import json
+
+    JSONDecodeError = json.JSONDecodeError
+
+    def loads(data: Any) -> Any:
+        """Parse JSON from str or bytes"""
+        try:
+            return json.loads(data)
+        except UnicodeDecodeError as e:
+            # Report undecodable bytes like orjson does so callers catch one error type
+            raise JSONDecodeError(str(e), "", 0) from e
+
+    def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+        """Serialize an object to a JSON string"""
+        return json.dumps(obj, indent=2 if indent else None, sort_keys=sort_keys)
+
+    def dumpb(obj: Any) -> bytes:
+        """Serialize an object to compact UTF-8 encoded JSON bytes"""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
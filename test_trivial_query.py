@@ -0,0 +1,62 @@
+"""Pin which query shapes the shared query_parsing helpers handle locally"""
+
+import pytest
+
+from query_parsing import is_bare_term, parse_trivial_query, strip_code_fence
+
+
+@pytest.mark.parametrize("query, site, term", [
+    ("search telegram for Trump", "telegram", "Trump"),
+    ("telegram Trump", "telegram", "Trump"),
+    ("gab posts about climate change", "gab", "climate change"),
+    ("Search Truthsocial for Joe Biden", "truthsocial", "Joe Biden"),
+    ("gettr crypto", "gettr", "crypto"),
+    ("win posts about election", "win", "election"),
+    ("telegram for anti-vax", "telegram", "anti-vax"),
+])
+def test_trivial_queries_are_parsed_locally(query, site, term):
+    assert parse_trivial_query(query) == {
+        "term": term, "site": site, "limit": 20, "querytype": "content"
+    }
+
+
+@pytest.mark.parametrize("query", [
+    "gab 100 posts about bitcoin",
+    "Search telegram for the most popular posts about vaccines",
+    "telegram messages mentioning Trump",
+    "gettr posts with hashtag maga",
+    "telegram Trump in 2024",
+    "win the election",
+    "win election",
+    "telegram posts",
+    "telegram for",
+    'telegram "trump" -biden',
+    "telegram Trump from last month",
+    "telegram Trump and Biden",
+    "telegram gab",
+    "telegram five posts",
+    "Search for telegram posts about Trump",
+    "Find Gettr posts from user miles about crypto",
+])
+def test_other_queries_go_to_claude(query):
+    assert parse_trivial_query(query) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("bitcoin", True),
+    ("climate change", True),
+    ("Find Gettr posts from user miles about crypto", False),
+    ("telegram", False),
+    ("bitcoin 2024", False),
+])
+def testis_bare_term(text, expected):
+    assert is_bare_term(text) is expected
+
+
+@pytest.mark.parametrize("response, expected", [
+    ('```json\n{"term": "x"}\n```', '{"term": "x"}'),
+    ('```\n[1, 2]\n```', '[1, 2]'),
+    ('  {"term": "x"}  ', '{"term": "x"}'),
+])
+def test_strip_code_fence(response, expected):
+    assert strip_code_fence(response) == expected